@@ -12,7 +12,7 @@ use rdkafka::ClientConfig;
 use rdkafka::consumer::{CommitMode, Consumer, StreamConsumer};
 use rdkafka::message::Message;
 use relay_core::model::EventMeta;
-use relay_core::sanitize::sanitize_payload;
+use relay_core::sanitize::{self, sanitize_payload};
 use serde::{Deserialize, Serialize};
 use serde_json::{Value, json};
 use std::env;
@@ -125,6 +125,7 @@ async fn main() -> Result<()> {
     let config = Config::from_env().context("load relay config")?;
     let ingress_runtime = resolve_ingress_runtime(&config).context("resolve ingress adapters")?;
     ensure_enabled_sources_have_handlers(&config).context("validate enabled sources")?;
+    sanitize::warm_up();
     if config.kafka_security_protocol == "plaintext" {
         warn!(
             "kafka plaintext transport is enabled (KAFKA_ALLOW_PLAINTEXT=true); use only on trusted private links"
@@ -411,7 +412,7 @@ async fn webhook_handler(
         }
     }
 
-    let sanitized_payload = match sanitize_payload(source, &payload) {
+    let sanitized_payload = match sanitize_payload(source, payload) {
         Ok(sanitized_payload) => sanitized_payload,
         Err(error) => {
             warn!(
@@ -700,7 +701,7 @@ async fn enqueue_prevalidated_event(
         "event".to_string()
     };
 
-    let sanitized_payload = sanitize_payload(&normalized_source, &payload)
+    let sanitized_payload = sanitize_payload(&normalized_source, payload)
         .map_err(|error| anyhow::anyhow!("payload sanitizer rejected request: {}", error))?;
     let (event_type, sanitized_payload, plugin_flags) =
         apply_serve_plugins(plugins, event_type, sanitized_payload)?;